@@ -1,102 +1,216 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import sqlite3
+import aiosqlite
 import asyncio
 import json
 import os
+import re
 import logging
-from datetime import datetime
-import openai
+import time
+import calendar
+from datetime import datetime, timezone
+from collections import OrderedDict
+from openai import AsyncOpenAI
 from typing import Optional
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from dataclasses import dataclass
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Bot configuration class with error checking
-class Config:
-    def __init__(self):
-        # Check if .env file exists
-        if not os.path.exists('.env'):
-            logger.error("❌ .env file not found!")
-            logger.error("Please make sure .env file is in the same folder as this script")
-            input("Press Enter to exit...")
-            exit(1)
-        
-        # Get Discord token
-        self.DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
-        if not self.DISCORD_TOKEN:
-            logger.error("❌ DISCORD_TOKEN not found in .env file!")
-            logger.error("Please add your Discord bot token to the .env file")
-            input("Press Enter to exit...")
-            exit(1)
-        
-        # Get and validate guild IDs
-        try:
-            main_guild_str = os.getenv('MAIN_GUILD_ID')
-            if not main_guild_str:
-                raise ValueError("MAIN_GUILD_ID is empty")
-            self.MAIN_GUILD_ID = int(main_guild_str)
-            
-            support_guild_str = os.getenv('SUPPORT_GUILD_ID')
-            if not support_guild_str:
-                raise ValueError("SUPPORT_GUILD_ID is empty")
-            self.SUPPORT_GUILD_ID = int(support_guild_str)
-            
-            staff_role_str = os.getenv('STAFF_ROLE_ID')
-            if not staff_role_str:
-                raise ValueError("STAFF_ROLE_ID is empty")
-            self.STAFF_ROLE_ID = int(staff_role_str)
-            
-            category_str = os.getenv('TICKET_CATEGORY_ID')
-            if not category_str:
-                raise ValueError("TICKET_CATEGORY_ID is empty")
-            self.TICKET_CATEGORY_ID = int(category_str)
-            
-        except (ValueError, TypeError) as e:
-            logger.error(f"❌ Error with Discord IDs in .env file: {e}")
-            logger.error("Please make sure all Discord IDs are valid numbers in your .env file")
-            input("Press Enter to exit...")
-            exit(1)
-        
-        # Optional OpenAI API key
-        self.OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-        if self.OPENAI_API_KEY:
-            try:
-                openai.api_key = self.OPENAI_API_KEY
-                logger.info("✅ OpenAI API key found - AI assistance enabled")
-            except Exception as e:
-                logger.warning(f"⚠️ OpenAI setup error: {e}")
+def load_env(path='.env'):
+    """Parse KEY=VALUE lines from a .env file into a dict"""
+    # utf-8-sig drops the BOM that Windows editors such as Notepad add
+    with open(path, encoding='utf-8-sig') as f:
+        text = f.read()
+    
+    values = {}
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line or line.startswith('#') or '=' not in line:
+            continue
+        key, _, value = line.partition('=')
+        key = key.strip()
+        if key.startswith('export '):
+            key = key[7:].strip()
+        value = value.strip()
+        if value[:1] in ('"', "'") and value.find(value[0], 1) != -1:
+            # Quoted value; anything after the closing quote is ignored
+            value = value[1:value.find(value[0], 1)]
         else:
-            logger.info("ℹ️ OpenAI API key not found - AI assistance disabled")
-        
-        # Validation successful
-        logger.info("✅ Configuration loaded successfully")
-        logger.info(f"✅ Main Guild ID: {self.MAIN_GUILD_ID}")
-        logger.info(f"✅ Support Guild ID: {self.SUPPORT_GUILD_ID}")
-        logger.info(f"✅ Staff Role ID: {self.STAFF_ROLE_ID}")
-        logger.info(f"✅ Ticket Category ID: {self.TICKET_CATEGORY_ID}")
+            # Unquoted value; drop an inline " # comment"
+            value = re.split(r'\s+#', value, maxsplit=1)[0]
+        values[key] = value
+    return values
+
+# Bot configuration, loaded once at startup
+@dataclass(frozen=True)
+class Config:
+    __slots__ = (
+        'DISCORD_TOKEN', 'MAIN_GUILD_ID', 'SUPPORT_GUILD_ID',
+        'STAFF_ROLE_ID', 'TICKET_CATEGORY_ID', 'OPENAI_API_KEY',
+    )
+    DISCORD_TOKEN: str
+    MAIN_GUILD_ID: int
+    SUPPORT_GUILD_ID: int
+    STAFF_ROLE_ID: int
+    TICKET_CATEGORY_ID: int
+    OPENAI_API_KEY: Optional[str]
+
+def load_config(path='.env'):
+    """Load and validate the bot configuration from the .env file"""
+    # Check if .env file exists
+    if not os.path.exists(path):
+        logger.error("❌ .env file not found!")
+        logger.error("Please make sure .env file is in the same folder as this script")
+        exit(1)
+    
+    # Variables already set in the process environment take precedence
+    env = load_env(path)
+    env.update((key, value) for key, value in os.environ.items() if key in Config.__slots__)
+    
+    # Get Discord token
+    discord_token = env.get('DISCORD_TOKEN')
+    if not discord_token:
+        logger.error("❌ DISCORD_TOKEN not found in .env file!")
+        logger.error("Please add your Discord bot token to the .env file")
+        exit(1)
+    
+    # Get and validate guild IDs
+    ids = {}
+    try:
+        for key in ('MAIN_GUILD_ID', 'SUPPORT_GUILD_ID', 'STAFF_ROLE_ID', 'TICKET_CATEGORY_ID'):
+            value = env.get(key)
+            if not value:
+                raise ValueError(f"{key} is empty")
+            ids[key] = int(value)
+    except (ValueError, TypeError) as e:
+        logger.error(f"❌ Error with Discord IDs in .env file: {e}")
+        logger.error("Please make sure all Discord IDs are valid numbers in your .env file")
+        exit(1)
+    
+    # Optional OpenAI API key
+    openai_api_key = env.get('OPENAI_API_KEY') or None
+    if openai_api_key:
+        logger.info("✅ OpenAI API key found - AI assistance enabled")
+    else:
+        logger.info("ℹ️ OpenAI API key not found - AI assistance disabled")
+    
+    loaded = Config(DISCORD_TOKEN=discord_token, OPENAI_API_KEY=openai_api_key, **ids)
+    
+    # Validation successful
+    logger.info("✅ Configuration loaded successfully")
+    logger.info(f"✅ Main Guild ID: {loaded.MAIN_GUILD_ID}")
+    logger.info(f"✅ Support Guild ID: {loaded.SUPPORT_GUILD_ID}")
+    logger.info(f"✅ Staff Role ID: {loaded.STAFF_ROLE_ID}")
+    logger.info(f"✅ Ticket Category ID: {loaded.TICKET_CATEGORY_ID}")
+    return loaded
 
-config = Config()
+config = load_config()
+
+# Async OpenAI client, only created when AI assistance is enabled
+ai_client = None
+if config.OPENAI_API_KEY:
+    try:
+        ai_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
+    except Exception as e:
+        logger.warning(f"⚠️ OpenAI setup error: {e}")
 
 # Database setup
 class Database:
+    # Message history is flushed after this many rows or seconds, whichever comes first
+    FLUSH_BATCH_SIZE = 50
+    FLUSH_INTERVAL = 0.25
+    # Queued by close() to tell the flusher to finish up and exit
+    _FLUSH_STOP = object()
+    
+    # Hot-path statements are kept as fixed strings so every call reuses
+    # the compiled statement from the connection's statement cache
+    SQL_CREATE_TICKET = """
+        INSERT INTO tickets (ticket_id, user_id, username, support_channel_id, category)
+        VALUES (?, ?, ?, ?, ?)
+    """
+    SQL_CLOSE_TICKET = """
+        UPDATE tickets SET status = 'closed', closed_at = CURRENT_TIMESTAMP
+        WHERE ticket_id = ?
+    """
+    SQL_GET_TICKET = """
+        SELECT ticket_id, user_id, username, status, created_at, closed_at, support_channel_id
+        FROM tickets WHERE ticket_id = ? LIMIT 1
+    """
+    SQL_OPEN_TICKETS = "SELECT ticket_id, user_id, support_channel_id FROM tickets WHERE status = 'open'"
+    SQL_ADD_MESSAGES = """
+        INSERT INTO ticket_messages (ticket_id, author_id, author_name, message_content, timestamp)
+        VALUES (?, ?, ?, ?, ?)
+    """
+    
     def __init__(self, db_name="tickets.db"):
         self.db_name = db_name
-        self.init_database()
+        self.conn = None
+        self._msg_queue = None
+        self._flush_task = None
+        # Open tickets by user and by support channel ID, sharing the same
+        # dicts; the bot is the only writer, so create/close keep these in
+        # sync with the database
+        self._open_by_user = {}
+        self.open_channels = {}
+    
+    async def start(self):
+        """Open the shared connection and initialize the schema"""
+        # Single long-lived connection; aiosqlite runs queries on its own
+        # worker thread so they never block the event loop
+        self.conn = await aiosqlite.connect(self.db_name, cached_statements=256)
+        self.conn.row_factory = aiosqlite.Row
+        await self.conn.execute("PRAGMA journal_mode=WAL")
+        await self.conn.execute("PRAGMA synchronous=NORMAL")
+        await self.conn.execute("PRAGMA temp_store=MEMORY")
+        await self.conn.execute("PRAGMA cache_size=-64000")
+        await self.init_database()
+        
+        async with self.conn.execute(self.SQL_OPEN_TICKETS) as cursor:
+            tickets = [dict(row) for row in await cursor.fetchall()]
+        # Every open ticket keeps its channel, even if a user somehow has two
+        self._open_by_user = {ticket['user_id']: ticket for ticket in tickets}
+        self.open_channels = {ticket['support_channel_id']: ticket for ticket in tickets}
+        
+        # Background writer for ticket message history
+        self._msg_queue = asyncio.Queue()
+        self._flush_task = asyncio.create_task(self._flusher())
     
-    def init_database(self):
-        """Initialize the database with required tables"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+    async def close(self):
+        """Close the shared connection so its worker thread can exit"""
+        if self.conn is None:
+            return
         
+        # Ask the flusher to stop once it has written everything queued ahead
+        # of the stop marker; it is never cancelled, so no batch is cut short
+        if self._flush_task is not None:
+            self._msg_queue.put_nowait(self._FLUSH_STOP)
+            try:
+                await self._flush_task
+            except Exception as e:
+                logger.error(f"Ticket message flusher failed: {e}")
+            self._flush_task = None
+        
+        # Write anything left behind if the flusher died early; the queue
+        # only exists once start() got past schema setup
+        rows = []
+        while self._msg_queue is not None and not self._msg_queue.empty():
+            item = self._msg_queue.get_nowait()
+            if item is not self._FLUSH_STOP:
+                rows.append(item)
+        if rows:
+            await self._write_batch(rows)
+        
+        await self.conn.execute("PRAGMA optimize")
+        await self.conn.close()
+        self.conn = None
+    
+    async def init_database(self):
+        """Initialize the database with required tables"""
         # Create tickets table
-        cursor.execute("""
+        await self.conn.execute("""
             CREATE TABLE IF NOT EXISTS tickets (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 ticket_id TEXT UNIQUE NOT NULL,
@@ -111,7 +225,7 @@ class Database:
         """)
         
         # Create messages table for ticket history
-        cursor.execute("""
+        await self.conn.execute("""
             CREATE TABLE IF NOT EXISTS ticket_messages (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 ticket_id TEXT NOT NULL,
@@ -123,78 +237,110 @@ class Database:
             )
         """)
         
-        conn.commit()
-        conn.close()
+        # Partial indexes for the hot open-ticket lookups; only open rows
+        # are indexed so they stay small as ticket history grows
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tickets_user_open
+            ON tickets (user_id) WHERE status = 'open'
+        """)
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tickets_channel_open
+            ON tickets (support_channel_id) WHERE status = 'open'
+        """)
+        await self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_msg_ticket
+            ON ticket_messages (ticket_id)
+        """)
+        
+        # Let SQLite refresh planner statistics only where they are missing
+        # or stale, rather than rescanning every table on each boot
+        await self.conn.execute("PRAGMA optimize=0x10002")
+        
+        await self.conn.commit()
         logger.info("✅ Database initialized successfully")
     
-    def create_ticket(self, ticket_id, user_id, username, support_channel_id, category='general'):
+    async def create_ticket(self, ticket_id, user_id, username, support_channel_id, category='general'):
         """Create a new ticket in the database"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute("""
-                INSERT INTO tickets (ticket_id, user_id, username, support_channel_id, category)
-                VALUES (?, ?, ?, ?, ?)
-            """, (ticket_id, user_id, username, support_channel_id, category))
-            conn.commit()
+            await self.conn.execute(
+                self.SQL_CREATE_TICKET,
+                (ticket_id, user_id, username, support_channel_id, category)
+            )
+            await self.conn.commit()
+            ticket = {
+                'ticket_id': ticket_id,
+                'user_id': user_id,
+                'support_channel_id': support_channel_id,
+            }
+            self._open_by_user[user_id] = ticket
+            self.open_channels[support_channel_id] = ticket
             return True
-        except sqlite3.IntegrityError:
+        except aiosqlite.IntegrityError:
             return False
-        finally:
-            conn.close()
     
-    def close_ticket(self, ticket_id):
+    async def close_ticket(self, ticket_id, user_id, support_channel_id):
         """Close a ticket"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE tickets SET status = 'closed', closed_at = CURRENT_TIMESTAMP
-            WHERE ticket_id = ?
-        """, (ticket_id,))
-        
-        conn.commit()
-        conn.close()
-    
-    def get_ticket(self, ticket_id):
+        await self.conn.execute(self.SQL_CLOSE_TICKET, (ticket_id,))
+        await self.conn.commit()
+        # Only forget the user's entry if it is this ticket, not another open one
+        if self._open_by_user.get(user_id, {}).get('ticket_id') == ticket_id:
+            del self._open_by_user[user_id]
+        self.open_channels.pop(support_channel_id, None)
+    
+    async def get_ticket(self, ticket_id):
         """Get ticket information"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT * FROM tickets WHERE ticket_id = ?
-        """, (ticket_id,))
-        
-        ticket = cursor.fetchone()
-        conn.close()
-        return ticket
+        async with self.conn.execute(self.SQL_GET_TICKET, (ticket_id,)) as cursor:
+            return await cursor.fetchone()
     
     def get_user_open_ticket(self, user_id):
         """Get user's open ticket if any"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT * FROM tickets WHERE user_id = ? AND status = 'open'
-        """, (user_id,))
-        
-        ticket = cursor.fetchone()
-        conn.close()
-        return ticket
-    
-    def add_message(self, ticket_id, author_id, author_name, message_content):
-        """Add a message to ticket history"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO ticket_messages (ticket_id, author_id, author_name, message_content)
-            VALUES (?, ?, ?, ?)
-        """, (ticket_id, author_id, author_name, message_content))
-        
-        conn.commit()
-        conn.close()
+        return self._open_by_user.get(user_id)
+    
+    def get_ticket_by_channel(self, channel_id):
+        """Get the open ticket linked to a support channel if any"""
+        return self.open_channels.get(channel_id)
+    
+    async def add_message(self, ticket_id, author_id, author_name, message_content):
+        """Queue a message for the ticket history flusher"""
+        timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        self._msg_queue.put_nowait((ticket_id, author_id, author_name, message_content, timestamp))
+    
+    async def add_messages(self, rows):
+        """Write many (ticket_id, author_id, author_name, content, timestamp) rows in one transaction"""
+        await self.conn.executemany(self.SQL_ADD_MESSAGES, rows)
+        await self.conn.commit()
+    
+    async def _write_batch(self, rows):
+        """Write one batch of queued messages, discarding it on failure"""
+        try:
+            await self.add_messages(rows)
+        except Exception as e:
+            # Undo any rows executemany inserted before failing, so a later
+            # commit does not persist half a batch
+            await self.conn.rollback()
+            logger.error(f"Failed to write {len(rows)} ticket message(s): {e}")
+    
+    async def _flusher(self):
+        """Write queued messages in batches, one transaction per batch"""
+        loop = asyncio.get_running_loop()
+        while True:
+            rows = []
+            item = await self._msg_queue.get()
+            deadline = loop.time() + self.FLUSH_INTERVAL
+            while item is not self._FLUSH_STOP:
+                rows.append(item)
+                remaining = deadline - loop.time()
+                if len(rows) >= self.FLUSH_BATCH_SIZE or remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._msg_queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            
+            if rows:
+                await self._write_batch(rows)
+            if item is self._FLUSH_STOP:
+                return
 
 # Initialize database
 db = Database()
@@ -206,29 +352,147 @@ intents.guilds = True           # For guild operations
 intents.guild_messages = True   # For guild messages
 intents.members = True          # For member operations (privileged)
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+class TicketBot(commands.Bot):
+    async def setup_hook(self):
+        global ticket_view, close_view
+        # Runs before connecting, so the database and persistent views are
+        # ready for the first gateway event or interaction
+        await db.start()
+        ticket_view = TicketView()
+        close_view = TicketCloseView()
+        self.add_view(ticket_view)
+        self.add_view(close_view)
+    
+    async def close(self):
+        # Stop the gateway first so no handler runs against a closed database
+        await super().close()
+        await db.close()
+
+bot = TicketBot(command_prefix='!', intents=intents)
+
+# Lookup caches
+class LRUCache:
+    """Small least-recently-used cache backed by an OrderedDict"""
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+    
+    def get(self, key):
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+    
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def pop(self, key):
+        self._data.pop(key, None)
+    
+    def clear(self):
+        self._data.clear()
+
+_channel_cache = LRUCache()
+_user_cache = LRUCache()
+
+# Support guild objects used on every ticket creation, resolved in on_ready
+_support_guild = None
+_staff_role = None
+_ticket_category = None
+_ticket_overwrites = None
+
+def resolve_support_objects():
+    """Resolve and cache the support guild, staff role and ticket category"""
+    global _support_guild, _staff_role, _ticket_category, _ticket_overwrites
+    _support_guild = bot.get_guild(config.SUPPORT_GUILD_ID)
+    _staff_role = _support_guild.get_role(config.STAFF_ROLE_ID) if _support_guild else None
+    
+    # Permission template shared by every ticket channel; discord.py only
+    # reads it when building the request, so one dict can be reused
+    if _support_guild and _staff_role:
+        _ticket_overwrites = {
+            _support_guild.default_role: discord.PermissionOverwrite(read_messages=False),
+            _staff_role: discord.PermissionOverwrite(
+                read_messages=True, 
+                send_messages=True,
+                manage_messages=True
+            )
+        }
+    else:
+        _ticket_overwrites = None
+    
+    # get_channel is a direct ID lookup, unlike scanning guild.categories
+    category = bot.get_channel(config.TICKET_CATEGORY_ID)
+    if isinstance(category, discord.CategoryChannel) and category.guild.id == config.SUPPORT_GUILD_ID:
+        _ticket_category = category
+    else:
+        _ticket_category = None
+
+def get_channel_cached(channel_id):
+    """Get a channel, caching hits until the channel is deleted"""
+    channel = _channel_cache.get(channel_id)
+    if channel is None:
+        channel = bot.get_channel(channel_id)
+        if channel is not None:
+            _channel_cache.put(channel_id, channel)
+    return channel
+
+def get_user_cached(user_id):
+    """Get a user, caching hits until the member leaves"""
+    user = _user_cache.get(user_id)
+    if user is None:
+        user = bot.get_user(user_id)
+        if user is not None:
+            _user_cache.put(user_id, user)
+    return user
 
 # Utility functions
 def generate_ticket_id(user_id):
     """Generate a unique ticket ID"""
-    return f"ticket-{user_id}-{int(datetime.now().timestamp())}"
+    return f"ticket-{user_id}-{int(time.time())}"
+
+def discord_timestamp(epoch, style='F'):
+    """Format a unix epoch as Discord timestamp markup, rendered by the client"""
+    return f"<t:{int(epoch)}:{style}>"
+
+def sqlite_to_epoch(value):
+    """Convert a SQLite CURRENT_TIMESTAMP value (UTC) to a unix epoch"""
+    return calendar.timegm(time.strptime(value, '%Y-%m-%d %H:%M:%S'))
+
+# Cached AI answers keyed by normalized question, as (fetched_at, response)
+AI_CACHE_TTL = 3600
+AI_REQUEST_TIMEOUT = 10
+_ai_cache = LRUCache(maxsize=512)
 
 async def get_ai_response(question):
     """Get AI response for general queries"""
-    if not config.OPENAI_API_KEY:
+    if ai_client is None:
         return "AI assistance is not configured. Please contact a staff member for help."
     
+    cache_key = ' '.join(question.lower().split())
+    cached = _ai_cache.get(cache_key)
+    if cached and time.time() - cached[0] < AI_CACHE_TTL:
+        return cached[1]
+    
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful support assistant. Provide brief, helpful responses to user questions."},
-                {"role": "user", "content": question}
-            ],
-            max_tokens=150,
-            temperature=0.7
+        response = await asyncio.wait_for(
+            ai_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "You are a helpful support assistant. Provide brief, helpful responses to user questions."},
+                    {"role": "user", "content": question}
+                ],
+                max_tokens=150,
+                temperature=0.7
+            ),
+            timeout=AI_REQUEST_TIMEOUT
         )
-        return response.choices[0].message.content.strip()
+        answer = response.choices[0].message.content.strip()
+        _ai_cache.put(cache_key, (time.time(), answer))
+        return answer
     except Exception as e:
         logger.error(f"OpenAI API error: {e}")
         return "I'm having trouble accessing AI assistance right now. Please contact a staff member for help."
@@ -245,22 +509,26 @@ class TicketView(discord.ui.View):
     async def handle_ticket_creation(self, interaction: discord.Interaction):
         """Handle ticket creation from button or command"""
         user = interaction.user
+        user_id = user.id
+        user_name = str(user)
         
         # Check if user already has an open ticket
-        existing_ticket = db.get_user_open_ticket(user.id)
+        existing_ticket = db.get_user_open_ticket(user_id)
         if existing_ticket:
             await interaction.response.send_message(
-                f"You already have an open ticket: {existing_ticket[1]}", 
+                f"You already have an open ticket: {existing_ticket['ticket_id']}", 
                 ephemeral=True
             )
             return
         
         # Generate ticket ID
-        ticket_id = generate_ticket_id(user.id)
+        ticket_id = generate_ticket_id(user_id)
         
         try:
             # Get support guild
-            support_guild = bot.get_guild(config.SUPPORT_GUILD_ID)
+            if _support_guild is None or _ticket_category is None or _staff_role is None:
+                resolve_support_objects()
+            support_guild = _support_guild
             if not support_guild:
                 await interaction.response.send_message(
                     "❌ Support server not found. Please contact an administrator.", 
@@ -270,7 +538,7 @@ class TicketView(discord.ui.View):
                 return
             
             # Create support channel
-            category = discord.utils.get(support_guild.categories, id=config.TICKET_CATEGORY_ID)
+            category = _ticket_category
             if not category:
                 await interaction.response.send_message(
                     "❌ Ticket category not found. Please contact an administrator.", 
@@ -279,8 +547,8 @@ class TicketView(discord.ui.View):
                 logger.error(f"Ticket category {config.TICKET_CATEGORY_ID} not found")
                 return
             
-            # Set permissions for the channel
-            staff_role = support_guild.get_role(config.STAFF_ROLE_ID)
+            # Staff role the channel permissions are built around
+            staff_role = _staff_role
             if not staff_role:
                 await interaction.response.send_message(
                     "❌ Staff role not found. Please contact an administrator.", 
@@ -289,36 +557,26 @@ class TicketView(discord.ui.View):
                 logger.error(f"Staff role {config.STAFF_ROLE_ID} not found")
                 return
             
-            overwrites = {
-                support_guild.default_role: discord.PermissionOverwrite(read_messages=False),
-                staff_role: discord.PermissionOverwrite(
-                    read_messages=True, 
-                    send_messages=True,
-                    manage_messages=True
-                )
-            }
-            
             # Create the support channel
             support_channel = await support_guild.create_text_channel(
                 name=f"ticket-{user.name}",
                 category=category,
-                overwrites=overwrites
+                overwrites=_ticket_overwrites
             )
             
             # Store ticket in database
-            db.create_ticket(ticket_id, user.id, str(user), support_channel.id)
+            await db.create_ticket(ticket_id, user_id, user_name, support_channel.id)
             
             # Create initial embed for support channel
             embed = discord.Embed(
                 title=f"🎫 Ticket: {ticket_id}",
-                description=f"**User:** {user.mention} ({user})\n**Created:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                description=f"**User:** {user.mention} ({user_name})\n**Created:** {discord_timestamp(ticket_id.rsplit('-', 1)[1])}",
                 color=discord.Color.blue()
             )
             embed.add_field(name="Status", value="🟢 Open", inline=False)
             embed.add_field(name="Instructions", value="User will send their query via DM. Staff can respond here.", inline=False)
             
             # Add close button for staff
-            close_view = TicketCloseView(ticket_id)
             await support_channel.send(f"<@&{config.STAFF_ROLE_ID}>", embed=embed, view=close_view)
             
             # Send DM to user
@@ -344,13 +602,13 @@ class TicketView(discord.ui.View):
                     f"✅ Ticket created successfully! Check your DMs for details. Ticket ID: `{ticket_id}`",
                     ephemeral=True
                 )
-                logger.info(f"✅ Ticket {ticket_id} created for user {user}")
+                logger.info(f"✅ Ticket {ticket_id} created for user {user_name}")
             except discord.Forbidden:
                 await interaction.response.send_message(
                     f"✅ Ticket created! However, I couldn't send you a DM. Please check your privacy settings.\nTicket ID: `{ticket_id}`",
                     ephemeral=True
                 )
-                logger.warning(f"Could not DM user {user} for ticket {ticket_id}")
+                logger.warning(f"Could not DM user {user_name} for ticket {ticket_id}")
             
         except Exception as e:
             logger.error(f"Error creating ticket: {e}")
@@ -359,54 +617,61 @@ class TicketView(discord.ui.View):
                 ephemeral=True
             )
 
-# Ticket close view for staff
+# Ticket close view for staff; stateless, so one instance serves every ticket
 class TicketCloseView(discord.ui.View):
-    def __init__(self, ticket_id):
+    def __init__(self):
         super().__init__(timeout=None)
-        self.ticket_id = ticket_id
     
     @discord.ui.button(label='🔒 Close Ticket', style=discord.ButtonStyle.danger, custom_id='close_ticket')
     async def close_ticket_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         # Check if user has staff role
-        if config.STAFF_ROLE_ID not in [role.id for role in interaction.user.roles]:
+        if interaction.user.get_role(config.STAFF_ROLE_ID) is None:
             await interaction.response.send_message("❌ Only staff members can close tickets.", ephemeral=True)
             return
         
+        # The button lives in the ticket's support channel, so resolve the ticket from it
+        ticket_info = db.get_ticket_by_channel(interaction.channel_id)
+        if not ticket_info:
+            await interaction.response.send_message("❌ Ticket is already closed.", ephemeral=True)
+            return
+        ticket_id = ticket_info['ticket_id']
+        
         # Close ticket in database
-        db.close_ticket(self.ticket_id)
+        await db.close_ticket(ticket_id, ticket_info['user_id'], ticket_info['support_channel_id'])
         
         # Update embed
         embed = discord.Embed(
-            title=f"🎫 Ticket: {self.ticket_id}",
-            description=f"**Closed by:** {interaction.user.mention}\n**Closed at:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            title=f"🎫 Ticket: {ticket_id}",
+            description=f"**Closed by:** {interaction.user.mention}\n**Closed at:** {discord_timestamp(time.time())}",
             color=discord.Color.red()
         )
         embed.add_field(name="Status", value="🔴 Closed", inline=False)
         
         await interaction.response.edit_message(embed=embed, view=None)
         
-        # Get ticket info
-        ticket_info = db.get_ticket(self.ticket_id)
-        if ticket_info:
-            user_id = ticket_info[2]  # user_id is at index 2
-            user = bot.get_user(user_id)
-            
-            if user:
-                try:
-                    close_embed = discord.Embed(
-                        title="🎫 Ticket Closed",
-                        description=f"Your ticket `{self.ticket_id}` has been closed by our support team.",
-                        color=discord.Color.orange()
-                    )
-                    close_embed.add_field(
-                        name="Need More Help?",
-                        value="Feel free to create a new ticket if you need further assistance.",
-                        inline=False
-                    )
-                    await user.send(embed=close_embed)
-                    logger.info(f"✅ Ticket {self.ticket_id} closed by {interaction.user}")
-                except discord.Forbidden:
-                    logger.warning(f"Could not DM user {user_id} about ticket closure")
+        user_id = ticket_info['user_id']
+        user = get_user_cached(user_id)
+        
+        if user:
+            try:
+                close_embed = discord.Embed(
+                    title="🎫 Ticket Closed",
+                    description=f"Your ticket `{ticket_id}` has been closed by our support team.",
+                    color=discord.Color.orange()
+                )
+                close_embed.add_field(
+                    name="Need More Help?",
+                    value="Feel free to create a new ticket if you need further assistance.",
+                    inline=False
+                )
+                await user.send(embed=close_embed)
+                logger.info(f"✅ Ticket {ticket_id} closed by {interaction.user}")
+            except discord.Forbidden:
+                logger.warning(f"Could not DM user {user_id} about ticket closure")
+
+# Shared stateless views, created in setup_hook once the event loop is running
+ticket_view = None
+close_view = None
 
 # Bot Events
 @bot.event
@@ -429,9 +694,12 @@ async def on_ready():
     else:
         logger.info(f"✅ Connected to support guild: {support_guild.name}")
     
-    # Add persistent views
-    bot.add_view(TicketView())
-    bot.add_view(TicketCloseView(""))  # Empty ticket_id for persistent view
+    # Cache support guild objects used on every ticket creation
+    resolve_support_objects()
+    if not _ticket_category:
+        logger.warning(f"⚠️ Ticket category {config.TICKET_CATEGORY_ID} not found in support guild")
+    if not _staff_role:
+        logger.warning(f"⚠️ Staff role {config.STAFF_ROLE_ID} not found in support guild")
     
     try:
         synced = await bot.tree.sync()
@@ -441,6 +709,30 @@ async def on_ready():
     
     logger.info("🎫 Discord Ticket Bot is ready!")
 
+@bot.event
+async def on_guild_channel_delete(channel):
+    # Drop stale cache entries for deleted channels and categories
+    _channel_cache.pop(channel.id)
+    if channel.id == config.TICKET_CATEGORY_ID:
+        resolve_support_objects()
+
+@bot.event
+async def on_guild_role_delete(role):
+    if role.id == config.STAFF_ROLE_ID:
+        resolve_support_objects()
+
+@bot.event
+async def on_guild_available(guild):
+    # Discord.py replaces the guild object after an outage, so cached
+    # channels still point at the old one; drop them and re-resolve
+    _channel_cache.clear()
+    if guild.id == config.SUPPORT_GUILD_ID:
+        resolve_support_objects()
+
+@bot.event
+async def on_member_remove(member):
+    _user_cache.pop(member.id)
+
 @bot.event
 async def on_message(message):
     # Ignore bot messages
@@ -461,10 +753,11 @@ async def on_message(message):
 async def handle_dm_message(message):
     """Handle messages in DMs"""
     user = message.author
+    user_id = user.id
     content = message.content
     
     # Check if user has an open ticket
-    ticket_info = db.get_user_open_ticket(user.id)
+    ticket_info = db.get_user_open_ticket(user_id)
     
     if not ticket_info:
         # No open ticket - offer to create one or provide AI assistance
@@ -504,25 +797,26 @@ async def handle_dm_message(message):
             )
             
             # Add create ticket button
-            view = TicketView()
-            await message.channel.send(embed=embed, view=view)
+            await message.channel.send(embed=embed, view=ticket_view)
     else:
         # User has an open ticket - forward message to support channel
-        ticket_id = ticket_info[1]
-        support_channel_id = ticket_info[7]  # support_channel_id is at index 7
+        ticket_id = ticket_info['ticket_id']
+        support_channel_id = ticket_info['support_channel_id']
         
         # Get support channel
-        support_channel = bot.get_channel(support_channel_id)
+        support_channel = get_channel_cached(support_channel_id)
         if support_channel:
+            user_name = str(user)
+            
             # Add message to database
-            db.add_message(ticket_id, user.id, str(user), content)
+            await db.add_message(ticket_id, user_id, user_name, content)
             
             # Forward message to support channel
             embed = discord.Embed(
-                title=f"💬 Message from {user}",
+                title=f"💬 Message from {user_name}",
                 description=content,
                 color=discord.Color.green(),
-                timestamp=datetime.now()
+                timestamp=discord.utils.utcnow()
             )
             
             await support_channel.send(embed=embed)
@@ -532,43 +826,45 @@ async def handle_dm_message(message):
 
 async def handle_support_message(message):
     """Handle messages in support channels"""
+    # Guards are ordered cheapest first so non-ticket chatter exits early
     if message.author.bot:
         return
     
-    # Check if this is a ticket channel
-    channel_name = message.channel.name
-    if channel_name.startswith('ticket-'):
-        # Find the ticket in database
-        conn = sqlite3.connect(db.db_name)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM tickets WHERE support_channel_id = ? AND status = 'open'", 
-                      (message.channel.id,))
-        ticket_info = cursor.fetchone()
-        conn.close()
-        
-        if ticket_info:
-            ticket_id = ticket_info[1]
-            user_id = ticket_info[2]
-            
-            # Add message to database
-            db.add_message(ticket_id, message.author.id, str(message.author), message.content)
+    channel = message.channel
+    if not isinstance(channel, discord.TextChannel) or channel.category_id != config.TICKET_CATEGORY_ID:
+        return
+    
+    # Open tickets are kept in memory, so channels without one are
+    # skipped and the ticket is read without touching the database
+    ticket_info = db.get_ticket_by_channel(channel.id)
+    if not ticket_info:
+        return
+    
+    ticket_id = ticket_info['ticket_id']
+    user_id = ticket_info['user_id']
+    author = message.author
+    author_name = str(author)
+    content = message.content
+    
+    # Add message to database
+    await db.add_message(ticket_id, author.id, author_name, content)
+    
+    # Forward message to user DM
+    user = get_user_cached(user_id)
+    if user:
+        try:
+            embed = discord.Embed(
+                title=f"💬 Support Response",
+                description=content,
+                color=discord.Color.blue(),
+                timestamp=discord.utils.utcnow()
+            )
+            embed.set_author(name=author_name, icon_url=author.display_avatar.url)
             
-            # Forward message to user DM
-            user = bot.get_user(user_id)
-            if user:
-                try:
-                    embed = discord.Embed(
-                        title=f"💬 Support Response",
-                        description=message.content,
-                        color=discord.Color.blue(),
-                        timestamp=datetime.now()
-                    )
-                    embed.set_author(name=str(message.author), icon_url=message.author.display_avatar.url)
-                    
-                    await user.send(embed=embed)
-                    await message.add_reaction('✅')
-                except discord.Forbidden:
-                    await message.channel.send("⚠️ Could not send DM to user (DMs disabled)")
+            await user.send(embed=embed)
+            await message.add_reaction('✅')
+        except discord.Forbidden:
+            await channel.send("⚠️ Could not send DM to user (DMs disabled)")
 
 # Slash Commands
 @bot.tree.command(name="setup", description="Setup the ticket system panel")
@@ -595,8 +891,7 @@ async def setup_tickets(interaction: discord.Interaction, channel: Optional[disc
         inline=False
     )
     
-    view = TicketView()
-    await channel.send(embed=embed, view=view)
+    await channel.send(embed=embed, view=ticket_view)
     await interaction.response.send_message(f"✅ Ticket panel set up in {channel.mention}!", ephemeral=True)
 
 @bot.tree.command(name="close", description="Close a ticket (Staff only)")
@@ -604,24 +899,24 @@ async def setup_tickets(interaction: discord.Interaction, channel: Optional[disc
 async def close_ticket_command(interaction: discord.Interaction, ticket_id: str):
     """Close a ticket via command"""
     # Check if user has staff role
-    if config.STAFF_ROLE_ID not in [role.id for role in interaction.user.roles]:
+    if interaction.user.get_role(config.STAFF_ROLE_ID) is None:
         await interaction.response.send_message("❌ Only staff members can close tickets.", ephemeral=True)
         return
     
-    ticket_info = db.get_ticket(ticket_id)
+    ticket_info = await db.get_ticket(ticket_id)
     if not ticket_info:
         await interaction.response.send_message("❌ Ticket not found.", ephemeral=True)
         return
     
-    if ticket_info[4] == 'closed':  # status is at index 4
+    if ticket_info['status'] == 'closed':
         await interaction.response.send_message("❌ Ticket is already closed.", ephemeral=True)
         return
     
     # Close ticket
-    db.close_ticket(ticket_id)
+    await db.close_ticket(ticket_id, ticket_info['user_id'], ticket_info['support_channel_id'])
     
     # Notify user
-    user = bot.get_user(ticket_info[2])  # user_id is at index 2
+    user = get_user_cached(ticket_info['user_id'])
     if user:
         try:
             embed = discord.Embed(
@@ -640,27 +935,27 @@ async def close_ticket_command(interaction: discord.Interaction, ticket_id: str)
 async def ticket_info(interaction: discord.Interaction, ticket_id: str):
     """Get ticket information"""
     # Check if user has staff role
-    if config.STAFF_ROLE_ID not in [role.id for role in interaction.user.roles]:
+    if interaction.user.get_role(config.STAFF_ROLE_ID) is None:
         await interaction.response.send_message("❌ Only staff members can view ticket information.", ephemeral=True)
         return
     
-    ticket_info = db.get_ticket(ticket_id)
+    ticket_info = await db.get_ticket(ticket_id)
     if not ticket_info:
         await interaction.response.send_message("❌ Ticket not found.", ephemeral=True)
         return
     
-    user = bot.get_user(ticket_info[2])
-    status_emoji = "🟢" if ticket_info[4] == 'open' else "🔴"
+    user = get_user_cached(ticket_info['user_id'])
+    status_emoji = "🟢" if ticket_info['status'] == 'open' else "🔴"
     
     embed = discord.Embed(
         title=f"🎫 Ticket Information: {ticket_id}",
-        color=discord.Color.blue() if ticket_info[4] == 'open' else discord.Color.red()
+        color=discord.Color.blue() if ticket_info['status'] == 'open' else discord.Color.red()
     )
-    embed.add_field(name="User", value=f"{user.mention if user else 'Unknown'} ({ticket_info[3]})", inline=True)
-    embed.add_field(name="Status", value=f"{status_emoji} {ticket_info[4].title()}", inline=True)
-    embed.add_field(name="Created", value=ticket_info[5], inline=True)
-    if ticket_info[6]:  # closed_at
-        embed.add_field(name="Closed", value=ticket_info[6], inline=True)
+    embed.add_field(name="User", value=f"{user.mention if user else 'Unknown'} ({ticket_info['username']})", inline=True)
+    embed.add_field(name="Status", value=f"{status_emoji} {ticket_info['status'].title()}", inline=True)
+    embed.add_field(name="Created", value=discord_timestamp(sqlite_to_epoch(ticket_info['created_at']), 'R'), inline=True)
+    if ticket_info['closed_at']:
+        embed.add_field(name="Closed", value=discord_timestamp(sqlite_to_epoch(ticket_info['closed_at']), 'R'), inline=True)
     
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
@@ -19,7 +19,7 @@ if %errorlevel% neq 0 (
 
 echo.
 echo Step 2: Installing bot dependencies...
-pip install discord.py>=2.3.2 python-dotenv>=1.0.0 openai>=0.28.0
+pip install discord.py>=2.3.2 openai>=1.0.0 aiosqlite>=0.19.0
 if %errorlevel% neq 0 (
     echo ERROR: Failed to install dependencies
     pause
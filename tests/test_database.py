@@ -0,0 +1,51 @@
+import asyncio
+import importlib
+import sqlite3
+import sys
+
+import pytest
+
+pytest.importorskip("discord")
+pytest.importorskip("openai")
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def main_bot(tmp_path, monkeypatch):
+    """Import main_bot against a throwaway .env in a temp directory"""
+    (tmp_path / ".env").write_text(
+        "DISCORD_TOKEN=test-token\n"
+        "MAIN_GUILD_ID=1\n"
+        "SUPPORT_GUILD_ID=2\n"
+        "STAFF_ROLE_ID=3\n"
+        "TICKET_CATEGORY_ID=4\n"
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    sys.modules.pop("main_bot", None)
+    return importlib.import_module("main_bot")
+
+
+def test_messages_queued_right_before_close_are_written(main_bot, tmp_path):
+    db_path = tmp_path / "tickets.db"
+    
+    async def run():
+        db = main_bot.Database(str(db_path))
+        await db.start()
+        await asyncio.sleep(0)
+        
+        # Let the flusher pick up the first row and start waiting for more
+        # before the second arrives, then close straight away
+        await db.add_message("ticket-1-100", 1, "user", "first")
+        await asyncio.sleep(0)
+        await db.add_message("ticket-1-100", 1, "user", "second")
+        close_task = asyncio.ensure_future(db.close())
+        done, _ = await asyncio.wait({close_task}, timeout=5)
+        assert close_task in done, "Database.close() did not finish"
+    
+    asyncio.run(run())
+    
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT message_content FROM ticket_messages ORDER BY id").fetchall()
+    conn.close()
+    assert rows == [("first",), ("second",)]